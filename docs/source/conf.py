@@ -10,11 +10,10 @@
 # add these directories to sys.path here. If the directory is relative to the
 # documentation root, use os.path.abspath to make it absolute, like shown here.
 #
+import functools
 import os
 import sys
 
-import git
-
 PROJECT_ROOT = "../.."
 
 sys.path.insert(0, os.path.abspath(PROJECT_ROOT))
@@ -28,12 +27,15 @@ author = 'Humanising Autonomy'
 
 
 # The full version, including alpha/beta/rc tags
+@functools.cache
 def fetch_version() -> str:
     # When using nox, `VERSION` is exported to the environment
     if env_version := os.getenv("VERSION"):
         return f"v{env_version}"
 
-    # for ReadTheDocs
+    # for ReadTheDocs. GitPython is slow to import, so only pay for it here.
+    import git
+
     repo = git.Repo(PROJECT_ROOT)
     if len(repo.tags):
         return str(next(reversed(repo.tags)))
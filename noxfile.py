@@ -1,9 +1,7 @@
 from pathlib import Path
-import shutil
+import re
 from typing import Literal
 
-import toml
-
 import nox
 
 nox.options.sessions = [
@@ -17,19 +15,26 @@ main_version = ["3.10"]
 supported_versions = main_version + []
 
 
+def _pip_install(session: nox.Session, extras: str) -> None:
+    # The sessions reuse the current environment (``python=False``), where
+    # ``session.install`` is not available, so pip is called directly.
+    # Prefer wheels, since they are cached by pip locally and in CI.
+    session.run("pip", "install", "--prefer-binary", f".[{extras}]")
+
+
 @nox.session(python=False)
 def install_core(session: nox.Session) -> None:
-    session.run("pip", "install", ".[lint,tests,build]")
+    _pip_install(session, "lint,tests,build")
 
 
 @nox.session(python=False)
 def install(session: nox.Session) -> None:
-    session.run("pip", "install", ".[lint,tests,build,documentation]")
+    _pip_install(session, "lint,tests,build,documentation")
 
 
 def _lint(session: nox.Session, install_dependencies: bool = False) -> None:
     if install_dependencies:
-        session.run("pip", "install", ".[lint]")
+        _pip_install(session, "lint")
     session.run("flake8")
     session.run("pyink", "--check", ".")
 
@@ -50,7 +55,7 @@ def _tests(
     report_format: Literal['html', 'xml'] = 'xml',
 ) -> None:
     if install_dependencies:
-        session.install(".[tests]")
+        _pip_install(session, "tests")
     session.run('./scripts/run_tests.sh')
     session.run('coverage', report_format)
 
@@ -67,24 +72,29 @@ def tests(session: nox.Session):
 
 @nox.session(python=False)
 def build(session: nox.Session):
-    version = None
-    file_name = "pyproject.toml"
-    saved_file_name = f"{file_name}.orig"
+    file = Path("pyproject.toml")
+    original = None
 
     if "--version" in session.posargs:
         version = session.posargs[session.posargs.index("--version") + 1]
-        shutil.copyfile(file_name, saved_file_name)
+        original = file.read_text()
 
-        file = Path(file_name)
-        data = toml.load(file)
-        data["project"]["version"] = version
-        data["project"]["dynamic"].remove("version")
-        file.write_text(toml.dumps(data))
+        # Pin the version in place instead of round-tripping the file through
+        # a toml parser, which would also drop comments and formatting.
+        def _pin_version(match: re.Match) -> str:
+            dynamic = re.sub(r'"version",?\s*', '', match[1])
+            return f'version = "{version}"\ndynamic = [{dynamic}]'
 
-    session.run("python", "-m", "build")
+        patched = re.sub(
+            r'^dynamic = \[(.*)\]$', _pin_version, original, count=1, flags=re.M
+        )
+        file.write_text(patched)
 
-    if version is not None:
-        shutil.move(saved_file_name, file_name)
+    try:
+        session.run("python", "-m", "build")
+    finally:
+        if original is not None:
+            file.write_text(original)
 
 
 @nox.session(python=False)
@@ -96,6 +106,11 @@ def docs(session: nox.Session, docs_format: str = "html") -> None:
         from setuptools_git_versioning import get_version
 
         version = str(get_version())
+    # Read and write the sources in parallel. The doctrees are kept in
+    # ``docs/build/doctrees``, so local rebuilds only reprocess changed files.
     session.run(
-        "bash", "-c", f"cd docs && make {docs_format}", env={"VERSION": version}
+        "bash",
+        "-c",
+        f"cd docs && make {docs_format}",
+        env={"VERSION": version, "SPHINXOPTS": "-j auto"},
     )
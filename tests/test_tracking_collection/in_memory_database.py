@@ -1,13 +1,24 @@
+import atexit
 import logging
-from functools import wraps
+from functools import lru_cache, wraps
 from unittest import TestCase
 
+import pymongo
 import pymongo.database
 import pymongo_inmemory
 
 
-# TODO: share this instance across all tests in a test module to speed things
-#  up.
+@lru_cache(maxsize=1)
+def _get_client() -> pymongo_inmemory.MongoClient:
+    # Spawning the mongod instance is the expensive part, so share a single
+    # instance across all the test cases run in the same process.
+    logging.getLogger("PYMONGOIM_DOWNLOADER").setLevel(logging.CRITICAL)
+    client = pymongo_inmemory.MongoClient()
+    logging.getLogger("PYMONGOIM_DOWNLOADER").setLevel(logging.WARNING)
+    atexit.register(client.close)
+    return client
+
+
 class InMemoryDatabaseSetup(TestCase):
     """An in-memory MongoDB instance."""
 
@@ -26,11 +37,38 @@ class InMemoryDatabaseSetup(TestCase):
 
     @classmethod
     def setUpClass(cls) -> None:
-        logging.getLogger("PYMONGOIM_DOWNLOADER").setLevel(logging.CRITICAL)
-        cls.client = pymongo_inmemory.MongoClient()
-        logging.getLogger("PYMONGOIM_DOWNLOADER").setLevel(logging.WARNING)
-        database_name = '__test__in_memory_db__'
-        cls.database = cls.client[database_name]
+        cls.client = _get_client()
+        # Each test case gets its own database on the shared instance.
+        cls.database_name = f'__test__in_memory_db__{cls.__name__}'
+        cls.database = cls.client[cls.database_name]
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        # Drop everything left behind by the test case in a single round trip.
+        cls.client.drop_database(cls.database_name)
+
+
+class UnconnectedDatabaseSetup(TestCase):
+    """A database handle that is never connected to a MongoDB instance.
+
+    ``pymongo`` only connects on the first operation, so this is enough for
+    tests that patch all the collection methods they call. Any unpatched
+    call fails fast instead of waiting for a server.
+    """
+
+    client: pymongo.MongoClient
+    database: pymongo.database.Database
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.client = pymongo.MongoClient(
+            connect=False, serverSelectionTimeoutMS=1
+        )
+        cls.database = cls.client['__test__unconnected_db__']
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.client.close()
 
 
 def build_and_destroy_collection(fn):
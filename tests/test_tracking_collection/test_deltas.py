@@ -1,77 +1,147 @@
 import datetime
-from collections import defaultdict
-from copy import deepcopy
-from typing import Dict, List, Tuple
-from unittest.mock import patch
+from functools import lru_cache
+from operator import itemgetter
+from typing import Dict, List, Optional, Set, Tuple
+from unittest.mock import DEFAULT, patch
 
-import deepdiff
+import bson
 import pymongo
 from bson import ObjectId
+from deepdiff import DeepDiff, Delta
 
 import versioned_collection.collection.tracking_collections
-from tests.test_tracking_collection.in_memory_database import InMemoryDatabaseSetup
+from tests.test_tracking_collection.in_memory_database import (
+    InMemoryDatabaseSetup,
+    UnconnectedDatabaseSetup,
+)
 from versioned_collection.collection.tracking_collections import DeltasCollection
 
 
 def _get_timestamp():
     # bson stores date times up to millisecond precision, so chop of the
-    # nanoseconds
+    # microseconds
     timestamp = datetime.datetime.utcnow()
-    timestamp = datetime.datetime.fromisoformat(
-        timestamp.isoformat(timespec='milliseconds')
-    )
-    return timestamp
+    return timestamp.replace(microsecond=timestamp.microsecond // 1000 * 1000)
+
+
+# A fixed timestamp for the fixtures, already truncated to milliseconds.
+_TIMESTAMP = datetime.datetime(2024, 1, 1)
 
 
 def _update_doc(doc, _id=None):
-    doc = deepcopy(doc)
-    doc['v'] += 1
+    # The test documents are flat and hold immutable values only, so a
+    # shallow copy is enough.
+    doc = {**doc, 'v': doc['v'] + 1}
     if _id is not None:
         doc['_id'] = _id
     return doc
 
 
+def _copy_delta_doc(delta_doc):
+    # add_delta modifies the delta documents returned by `find` and their
+    # 'next' list. All the other values are immutable.
+    return {**delta_doc, 'next': list(delta_doc['next'])}
+
+
+_DELTAS_CACHE: Dict[Tuple[bytes, bytes], Tuple[Delta, ...]] = dict()
+
+
 def _get_forward_backward_deltas(doc_old, doc_new):
-    forward = deepdiff.Delta(
-        deepdiff.DeepDiff(
-            doc_old,
-            doc_new,
-            ignore_order=False,
-            report_repetition=False,
+    # The same pairs of documents are diffed over and over by the fixtures,
+    # so cache the deltas by content. The documents are keyed by their BSON
+    # encoding, which also tells apart equal values of different types
+    # (e.g., 1 and 1.0), unlike hashing their items. Keying by ``id`` is not
+    # safe, since the ids of the garbage collected documents are reused.
+    key = bson.encode(doc_old), bson.encode(doc_new)
+    if key not in _DELTAS_CACHE:
+        forward = Delta(
+            DeepDiff(
+                doc_old,
+                doc_new,
+                ignore_order=False,
+                report_repetition=False,
+            )
+        )
+        backward = Delta(
+            DeepDiff(
+                doc_new,
+                doc_old,
+                ignore_order=False,
+                report_repetition=False,
+            )
         )
-    )
-    backward = deepdiff.Delta(
-        deepdiff.DeepDiff(
-            doc_new,
-            doc_old,
-            ignore_order=False,
-            report_repetition=False,
+        _DELTAS_CACHE[key] = forward, backward
+    return _DELTAS_CACHE[key]
+
+
+@lru_cache(maxsize=None)
+def _dumps(delta: Delta) -> bytes:
+    # The cached deltas are serialized many times by the fixtures and
+    # expected delta documents. Deltas are hashed by identity, so each one
+    # is pickled only once.
+    return delta.dumps()
+
+
+def _build_delta_tree(
+    doc_id: ObjectId,
+    tree: Dict[str, Tuple[int, str, Optional[str], Dict, Dict]],
+) -> Tuple[Dict[str, Dict], Dict[str, Dict[str, Delta]]]:
+    """Build the delta documents of a per-document delta tree.
+
+    :param doc_id: The id of the document modified by the deltas.
+    :param tree: Maps each delta label to its version, branch, the label of
+        its parent and the old and new versions of the document. The deltas
+        are expected in the order in which they were registered.
+    :return: The delta documents and the deltas, by label.
+    """
+    # Compute all the deltas first, then lay out the documents.
+    deltas = {
+        label: dict(zip('fb', _get_forward_backward_deltas(old, new)))
+        for label, (_, _, _, old, new) in tree.items()
+    }
+    ids = {label: ObjectId() for label in tree}
+    delta_docs = dict()
+    for i, (label, (version, branch, prev, _, _)) in enumerate(tree.items()):
+        delta_docs[label] = dict(
+            _id=ids[label],
+            document_id=doc_id,
+            collection_version_id=version,
+            branch=branch,
+            # The deltas are sorted by their timestamps, so keep them
+            # distinct and in the order of registration.
+            timestamp=_TIMESTAMP + datetime.timedelta(milliseconds=i),
+            forward=_dumps(deltas[label]['f']),
+            backward=_dumps(deltas[label]['b']),
+            prev=None if prev is None else ids[prev],
+            next=[],
         )
-    )
-    return forward, backward
+        if prev is not None:
+            delta_docs[prev]['next'].append(ids[label])
+    return delta_docs, deltas
 
 
 class TestDeltasCollectionIntegration(InMemoryDatabaseSetup):
 
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.col = DeltasCollection(cls.database, 'col')
+
     def setUp(self) -> None:
-        self.col = DeltasCollection(self.database, 'col')
         self.doc = {'_id': ObjectId(), 'v': 0, 'a_field': 'a_value'}
 
     def tearDown(self) -> None:
-        self.col.drop()
+        # Cheaper than dropping and recreating the collection for each test.
+        self.col.delete_many({})
 
-    def assertEqualDeltaLists(
-        self, l1: List[deepdiff.Delta], l2: List[deepdiff.Delta]
-    ) -> None:
+    def assertEqualDeltaLists(self, l1: List[Delta], l2: List[Delta]) -> None:
         # deepdiff.Delta does not implement equality, so compare the
         # underlying diffs.
         # Alternatively, we can compare the __dict__ repr of each delta,
         # but a delta is only a wrapper that applies a deepdiff.DeepDiff,
         # so that should be enough
 
-        self.assertEqual(len(l1), len(l2))
-        for d1, d2 in zip(l1, l2):
-            self.assertEqual(d1.diff, d2.diff)
+        self.assertEqual([d.diff for d in l1], [d.diff for d in l2])
 
     def test_deltas_build_returns_false_if_collection_already_exists(self):
         col = DeltasCollection(self.database, 'col')
@@ -83,10 +153,25 @@ class TestDeltasCollectionIntegration(InMemoryDatabaseSetup):
             exists_mock.return_value = True
             self.assertFalse(col.build())
 
+    def test_building_the_collection_indexes_the_versions(self):
+        # The deltas are matched by version and branch when moving between
+        # versions, so this index must back the $match stage.
+        col = DeltasCollection(self.database, 'fresh_collection')
+        self.assertTrue(col.build())
+        indexes = col.index_information()
+        col.drop()
+        self.assertEqual(
+            [
+                ('collection_version_id', pymongo.DESCENDING),
+                ('branch', pymongo.ASCENDING),
+            ],
+            indexes['collection_version_id_-1_branch_1']['key'],
+        )
+
     def test_add_delta_for_an_unmodified_document_returns_none(self):
         delta_id = self.col.add_delta(
             document_new=self.doc,
-            document_old=deepcopy(self.doc),
+            document_old=dict(self.doc),
             document_id=self.doc['_id'],
             collection_version=1,
             branch='main',
@@ -122,10 +207,10 @@ class TestDeltasCollectionIntegration(InMemoryDatabaseSetup):
         self.assertIsNone(delta['prev'])
         self.assertEqual([], delta['next'])
 
-        forward_delta = deepdiff.Delta(
+        forward_delta = Delta(
             delta['forward'], safe_to_import={'bson.objectid.ObjectId'}
         )
-        backward_delta = deepdiff.Delta(
+        backward_delta = Delta(
             delta['backward'], safe_to_import={'bson.objectid.ObjectId'}
         )
 
@@ -196,11 +281,27 @@ class TestDeltasCollectionIntegration(InMemoryDatabaseSetup):
         second_delta = self.col.find_one({'_id': second_delta_id})
         self.assertIsNone(second_delta['prev'])
 
+    def _insert_delta_tree(
+        self,
+        doc_id: ObjectId,
+        tree: Dict[str, Tuple[int, str, Optional[str], Dict, Dict]],
+    ) -> Tuple[Dict[str, ObjectId], Dict[str, Dict[str, Delta]]]:
+        """Insert a per-document delta tree in a single round trip.
+
+        ``add_delta`` is tested separately, so the fixtures build the delta
+        documents directly from the known shape of the delta tree.
+
+        :return: The ids and the deltas, by label.
+        """
+        delta_docs, deltas = _build_delta_tree(doc_id, tree)
+        self.col.insert_many(list(delta_docs.values()))
+        return {label: d['_id'] for label, d in delta_docs.items()}, deltas
+
     def _setup_1(
         self,
     ) -> Tuple[
         Dict[ObjectId, Dict[str, ObjectId]],
-        Dict[ObjectId, Dict[str, Dict[str, deepdiff.Delta]]],
+        Dict[ObjectId, Dict[str, Dict[str, Delta]]],
     ]:
         """Setup for self.doc.
 
@@ -214,79 +315,19 @@ class TestDeltasCollectionIntegration(InMemoryDatabaseSetup):
                           \\
                           3_m
         """
-
-        d1_deltas = defaultdict(dict)
-
-        d_old = dict()
-        d_new = self.doc
-        forward, backward = _get_forward_backward_deltas(d_old, d_new)
-        d1_deltas['1_m']['f'] = forward
-        d1_deltas['1_m']['b'] = backward
-        d1_m = self.col.add_delta(
-            document_new=d_new,
-            document_old=d_old,
-            document_id=self.doc['_id'],
-            collection_version=1,
-            branch='main',
-            timestamp=_get_timestamp(),
-            branch_history=[(0, 'main')],
-        )
-
-        d_old = self.doc
-        d_new = _update_doc(self.doc)
-        forward, backward = _get_forward_backward_deltas(d_old, d_new)
-        d1_deltas['2_m']['f'] = forward
-        d1_deltas['2_m']['b'] = backward
-        d2_m = self.col.add_delta(
-            document_new=d_new,
-            document_old=d_old,
-            document_id=self.doc['_id'],
-            collection_version=2,
-            branch='main',
-            timestamp=_get_timestamp(),
-            branch_history=[(1, 'main'), (0, 'main')],
-        )
-
-        d_old = d_new
-        d_new = _update_doc(d_new)
-        forward, backward = _get_forward_backward_deltas(d_old, d_new)
-        d1_deltas['3_m']['f'] = forward
-        d1_deltas['3_m']['b'] = backward
-        d3_m = self.col.add_delta(
-            document_new=d_new,
-            document_old=d_old,
-            document_id=self.doc['_id'],
-            collection_version=3,
-            branch='main',
-            timestamp=_get_timestamp(),
-            branch_history=[(2, 'main'), (1, 'main'), (0, 'main')],
-        )
-        d_old = dict()
-        d_new = self.doc
-        forward, backward = _get_forward_backward_deltas(d_old, d_new)
-        d1_deltas['0_b']['f'] = forward
-        d1_deltas['0_b']['b'] = backward
-        d0_b = self.col.add_delta(
-            document_new=self.doc,
-            document_old=dict(),
-            document_id=self.doc['_id'],
-            collection_version=0,
-            branch='b',
-            timestamp=_get_timestamp(),
-            branch_history=[(1, 'main'), (0, 'main')],
+        doc_v1 = self.doc
+        doc_v2 = _update_doc(doc_v1)
+        doc_v3 = _update_doc(doc_v2)
+        ids, deltas = self._insert_delta_tree(
+            self.doc['_id'],
+            {
+                '1_m': (1, 'main', None, dict(), doc_v1),
+                '2_m': (2, 'main', '1_m', doc_v1, doc_v2),
+                '3_m': (3, 'main', '2_m', doc_v2, doc_v3),
+                '0_b': (0, 'b', '1_m', dict(), doc_v1),
+            },
         )
-
-        deep_deltas = dict()
-        deep_deltas[self.doc['_id']] = d1_deltas
-
-        delta_ids = dict()
-        delta_ids[self.doc['_id']] = {
-            '1_m': d1_m,
-            '2_m': d2_m,
-            '3_m': d3_m,
-            '0_b': d0_b,
-        }
-        return delta_ids, deep_deltas
+        return {self.doc['_id']: ids}, {self.doc['_id']: deltas}
 
     def test_get_delta_documents_in_path_forward(self):
         delta_ids, _ = self._setup_1()
@@ -300,7 +341,7 @@ class TestDeltasCollectionIntegration(InMemoryDatabaseSetup):
         group = deltas[0]
         self.assertEqual(self.doc['_id'], group['_id'])
 
-        ret_deltas_ids = [d['_id'] for d in group['deltas']]
+        ret_deltas_ids = list(map(itemgetter('_id'), group['deltas']))
         expected_deltas_ids = [
             delta_ids['1_m'],
             delta_ids['2_m'],
@@ -326,7 +367,7 @@ class TestDeltasCollectionIntegration(InMemoryDatabaseSetup):
         group = deltas[0]
         self.assertEqual(self.doc['_id'], group['_id'])
 
-        ret_deltas_ids = [d['_id'] for d in group['deltas']]
+        ret_deltas_ids = list(map(itemgetter('_id'), group['deltas']))
         expected_deltas_ids = [
             delta_ids['3_m'],
             delta_ids['2_m'],
@@ -343,7 +384,7 @@ class TestDeltasCollectionIntegration(InMemoryDatabaseSetup):
         group = deltas[0]
         self.assertEqual(self.doc['_id'], group['_id'])
 
-        ret_deltas_ids = {d['_id'] for d in group['deltas']}
+        ret_deltas_ids = set(map(itemgetter('_id'), group['deltas']))
         expected_deltas_ids = {
             delta_ids['3_m'],
             delta_ids['2_m'],
@@ -367,64 +408,16 @@ class TestDeltasCollectionIntegration(InMemoryDatabaseSetup):
         """
         delta_ids, deep_deltas = self._setup_1()
 
-        self.doc2 = deepcopy(self.doc)
-        self.doc2['_id'] = ObjectId()
-        self.doc2['stop'] = 'hammer time'
-
-        d2_deltas = defaultdict(dict)
-
-        d_old = dict()
-        d_new = self.doc2
-        forward, backward = _get_forward_backward_deltas(d_old, d_new)
-        d2_deltas['0_c']['f'] = forward
-        d2_deltas['0_c']['b'] = backward
-        d2_0_c = self.col.add_delta(
-            document_new=d_new,
-            document_old=d_old,
-            document_id=self.doc2['_id'],
-            collection_version=0,
-            branch='c',
-            timestamp=_get_timestamp(),
-            branch_history=[(0, 'main')],
-        )
-
-        d_old = dict()
-        d_new = self.doc2
-        forward, backward = _get_forward_backward_deltas(d_old, d_new)
-        d2_deltas['1_m']['f'] = forward
-        d2_deltas['1_m']['b'] = backward
-        d2_1_m = self.col.add_delta(
-            document_new=d_new,
-            document_old=d_old,
-            document_id=self.doc2['_id'],
-            collection_version=1,
-            branch='main',
-            timestamp=_get_timestamp(),
-            branch_history=[(0, 'main')],
-        )
-
-        d_old = self.doc2
-        d_new = _update_doc(self.doc2)
-        forward, backward = _get_forward_backward_deltas(d_old, d_new)
-        d2_deltas['3_m']['f'] = forward
-        d2_deltas['3_m']['b'] = backward
-        d2_3_m = self.col.add_delta(
-            document_new=d_new,
-            document_old=d_old,
-            document_id=self.doc2['_id'],
-            collection_version=3,
-            branch='main',
-            timestamp=_get_timestamp(),
-            branch_history=[(2, 'main'), (1, 'main'), (0, 'main')],
+        self.doc2 = {**self.doc, '_id': ObjectId(), 'stop': 'hammer time'}
+        doc2_id = self.doc2['_id']
+        delta_ids[doc2_id], deep_deltas[doc2_id] = self._insert_delta_tree(
+            doc2_id,
+            {
+                '0_c': (0, 'c', None, dict(), self.doc2),
+                '1_m': (1, 'main', None, dict(), self.doc2),
+                '3_m': (3, 'main', '1_m', self.doc2, _update_doc(self.doc2)),
+            },
         )
-
-        delta_ids[self.doc2['_id']] = {
-            '1_m': d2_1_m,
-            '3_m': d2_3_m,
-            '0_c': d2_0_c,
-        }
-        deep_deltas[self.doc2['_id']] = d2_deltas
-
         return delta_ids, deep_deltas
 
     def test_get_deltas(self):
@@ -500,44 +493,75 @@ class TestDeltasCollectionIntegration(InMemoryDatabaseSetup):
         self.assertEqual(delta_ids['1_m'], res[0]['_id'])
 
 
-class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
+class TestDeltasCollectionUnitTests(UnconnectedDatabaseSetup):
 
     @classmethod
     def setUpClass(cls) -> None:
         super().setUpClass()
         cls.col = DeltasCollection(cls.database, 'col')
+        # The tests only use mocks, so they can share the same document and
+        # the deltas of its most common changes can be computed only once.
+        cls.doc = {'_id': ObjectId(), 'v': 0, 'a_field': 'a_value'}
+        cls.insert_deltas = _get_forward_backward_deltas(dict(), cls.doc)
+        cls.update_deltas = _get_forward_backward_deltas(
+            cls.doc, _update_doc(cls.doc)
+        )
+        # The fixtures are only read by the tests, so build them once.
+        cls.delta_docs, cls.deep_deltas = cls._build_fixtures()
 
     def setUp(self) -> None:
-        self.doc = {'_id': ObjectId(), 'v': 0, 'a_field': 'a_value'}
-
-    def assertEqualDeltaLists(
-        self, l1: List[deepdiff.Delta], l2: List[deepdiff.Delta]
-    ) -> None:
+        # Patch all the collection methods used by the tests at once.
+        patcher = patch.multiple(
+            pymongo.collection.Collection,
+            find=DEFAULT,
+            update_one=DEFAULT,
+            insert_one=DEFAULT,
+            insert_many=DEFAULT,
+            find_one_and_update=DEFAULT,
+            aggregate=DEFAULT,
+            bulk_write=DEFAULT,
+        )
+        self.mocks = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertEqualDeltaLists(self, l1: List[Delta], l2: List[Delta]) -> None:
         # deepdiff.Delta does not implement equality, so compare the
         # underlying diffs.
         # Alternatively, we can compare the __dict__ repr of each delta,
         # but a delta is only a wrapper that applies a deepdiff.DeepDiff,
         # so that should be enough
 
-        self.assertEqual(len(l1), len(l2))
-        for d1, d2 in zip(l1, l2):
-            self.assertEqual(d1.diff, d2.diff)
+        self.assertEqual([d.diff for d in l1], [d.diff for d in l2])
 
-    @patch.object(pymongo.collection.Collection, 'find')
-    @patch.object(pymongo.collection.Collection, 'update_one')
-    @patch.object(pymongo.collection.Collection, 'insert_one')
-    @patch.object(pymongo.collection.Collection, 'find_one_and_update')
-    def test_add_delta(
-        self,
-        find_one_and_update_mock,
-        insert_one_mock,
-        update_one_mock,
-        find_mock,
-    ):
-        find_mock.return_value = []
+    def assertPathDeltasMatched(self, versions: Dict[str, Set[int]]) -> None:
+        # The order of the matched branches and versions is irrelevant, so
+        # compare them as sets.
+        self.mocks['aggregate'].assert_called_once()
+        (pipeline,), _ = self.mocks['aggregate'].call_args
+        clauses = pipeline[0]["$match"]["$or"]
+        matched = {
+            c['branch']: set(c['collection_version_id']["$in"]) for c in clauses
+        }
+        # A single clause per branch
+        self.assertEqual(len(clauses), len(matched))
+        self.assertEqual(versions, matched)
+        self.assertEqual(
+            [
+                {
+                    "$group": {
+                        '_id': "$document_id",
+                        'deltas': {"$push": "$$ROOT"},
+                    }
+                }
+            ],
+            pipeline[1:],
+        )
+
+    def test_add_delta(self):
+        self.mocks['find'].return_value = []
 
         delta_id = ObjectId()
-        timestamp = _get_timestamp()
+        timestamp = _TIMESTAMP
         ret_delta_id = self.col.add_delta(
             document_new=self.doc,
             document_old=dict(),
@@ -550,9 +574,7 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
         )
         self.assertEqual(delta_id, ret_delta_id)
 
-        forward, backward = _get_forward_backward_deltas(
-            doc_old=dict(), doc_new=self.doc
-        )
+        forward, backward = self.insert_deltas
 
         delta_doc = dict(
             _id=delta_id,
@@ -560,45 +582,41 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
             collection_version_id=1,
             branch='main',
             timestamp=timestamp,
-            forward=forward.dumps(),
-            backward=backward.dumps(),
+            forward=_dumps(forward),
+            backward=_dumps(backward),
             prev=None,
             next=[],
         )
 
-        find_one_and_update_mock.assert_not_called()
-        update_one_mock.assert_not_called()
-        insert_one_mock.assert_called_once_with(delta_doc)
+        self.mocks['bulk_write'].assert_called_once_with(
+            [pymongo.InsertOne(delta_doc)]
+        )
 
     def _test_add_delta_with_existing_parent(
         self,
-        find_one_and_update_mock,
-        insert_one_mock,
-        update_one_mock,
-        find_mock,
         child_version: int,
         child_branch: str,
     ):
-        forward, backward = _get_forward_backward_deltas(dict(), self.doc)
+        forward, backward = self.insert_deltas
 
         parent_delta = dict(
             _id=ObjectId(),
             document_id=self.doc['_id'],
             collection_version_id=1,
             branch='main',
-            timestamp=_get_timestamp(),
-            forward=forward.dumps(),
-            backward=backward.dumps(),
+            timestamp=_TIMESTAMP,
+            forward=_dumps(forward),
+            backward=_dumps(backward),
             prev=None,
             next=[],
         )
-        find_mock.return_value = [deepcopy(parent_delta)]
+        self.mocks['find'].return_value = [_copy_delta_doc(parent_delta)]
 
         doc_old = self.doc
         doc_new = _update_doc(doc_old)
 
         delta_id = ObjectId()
-        timestamp = _get_timestamp()
+        timestamp = _TIMESTAMP
         ret_delta_id = self.col.add_delta(
             document_new=doc_new,
             document_old=doc_old,
@@ -611,8 +629,6 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
         )
         self.assertEqual(delta_id, ret_delta_id)
 
-        update_one_mock.assert_not_called()
-
         forward, backward = _get_forward_backward_deltas(doc_old, doc_new)
         delta_doc = dict(
             _id=delta_id,
@@ -620,57 +636,34 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
             collection_version_id=child_version,
             branch=child_branch,
             timestamp=timestamp,
-            forward=forward.dumps(),
-            backward=backward.dumps(),
+            forward=_dumps(forward),
+            backward=_dumps(backward),
             prev=parent_delta['_id'],
             next=[],
         )
-        insert_one_mock.assert_called_once_with(delta_doc)
+        self.mocks['bulk_write'].assert_called_once_with([
+            pymongo.InsertOne(delta_doc),
+            pymongo.UpdateOne(
+                {'_id': parent_delta['_id']},
+                {"$set": {"next": [delta_id]}},
+            ),
+        ])
 
-        find_one_and_update_mock.assert_called_once_with(
-            filter={'_id': parent_delta['_id']},
-            update={"$set": {"next": [delta_id]}},
-        )
-
-    @patch.object(pymongo.collection.Collection, 'find')
-    @patch.object(pymongo.collection.Collection, 'update_one')
-    @patch.object(pymongo.collection.Collection, 'insert_one')
-    @patch.object(pymongo.collection.Collection, 'find_one_and_update')
-    def test_add_delta_with_existing_parent(
-        self,
-        find_one_and_update_mock,
-        insert_one_mock,
-        update_one_mock,
-        find_mock,
-    ):
+    def test_add_delta_with_existing_parent(self):
         self._test_add_delta_with_existing_parent(
-            find_one_and_update_mock,
-            insert_one_mock,
-            update_one_mock,
-            find_mock,
             child_version=2,
             child_branch='main',
         )
 
-    @patch.object(pymongo.collection.Collection, 'find')
-    @patch.object(pymongo.collection.Collection, 'update_one')
-    @patch.object(pymongo.collection.Collection, 'insert_one')
-    @patch.object(pymongo.collection.Collection, 'find_one_and_update')
-    def test_update_already_added_delta(
-        self,
-        find_one_and_update_mock,
-        insert_one_mock,
-        update_one_mock,
-        find_mock,
-    ):
+    def test_update_already_added_delta(self):
         # This is a bit awkward, but it can happen in the rare situation the
         # change streams (and the listener) take too long to process the
         # modified documents -> better have some extra checks than producing
         # invalid collection states.
         # Remove this test after finding a permanent solution.
 
-        forward, backward = _get_forward_backward_deltas(dict(), self.doc)
-        timestamp = _get_timestamp()
+        forward, backward = self.insert_deltas
+        timestamp = _TIMESTAMP
 
         first_delta = dict(
             _id=ObjectId(),
@@ -678,12 +671,12 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
             collection_version_id=1,
             branch='main',
             timestamp=timestamp,
-            forward=forward.dumps(),
-            backward=backward.dumps(),
+            forward=_dumps(forward),
+            backward=_dumps(backward),
             prev=None,
             next=[],
         )
-        find_mock.return_value = [deepcopy(first_delta)]
+        self.mocks['find'].return_value = [_copy_delta_doc(first_delta)]
 
         # not a new version, but a new update before registering the doc
         doc_old = dict()
@@ -702,64 +695,56 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
         )
         self.assertEqual(first_delta['_id'], ret_delta_id)
 
-        insert_one_mock.assert_not_called()
-        find_one_and_update_mock.assert_not_called()
-
         forward2, backward2 = _get_forward_backward_deltas(doc_old, doc_new)
 
-        update_one_mock.assert_called_once_with(
-            {'_id': first_delta['_id']},
-            update={
-                "$set": {
-                    'forward': forward2.dumps(),
-                    'backward': backward2.dumps(),
-                }
-            },
+        self.mocks['bulk_write'].assert_called_once_with(
+            [
+                pymongo.UpdateOne(
+                    {'_id': first_delta['_id']},
+                    {
+                        "$set": {
+                            'forward': _dumps(forward2),
+                            'backward': _dumps(backward2),
+                        }
+                    },
+                )
+            ]
         )
 
-    @patch.object(pymongo.collection.Collection, 'find')
-    @patch.object(pymongo.collection.Collection, 'update_one')
-    @patch.object(pymongo.collection.Collection, 'insert_one')
-    @patch.object(pymongo.collection.Collection, 'find_one_and_update')
-    def test_update_already_added_delta2(
-        self,
-        find_one_and_update_mock,
-        insert_one_mock,
-        update_one_mock,
-        find_mock,
-    ):
+    def test_update_already_added_delta2(self):
         first_delta_id = ObjectId()
 
-        forward, backward = _get_forward_backward_deltas(dict(), self.doc)
+        forward, backward = self.insert_deltas
         parent_delta = dict(
             _id=ObjectId(),
             document_id=self.doc['_id'],
             collection_version_id=1,
             branch='main',
-            timestamp=_get_timestamp(),
-            forward=forward.dumps(),
-            backward=backward.dumps(),
+            timestamp=_TIMESTAMP,
+            forward=_dumps(forward),
+            backward=_dumps(backward),
             prev=None,
             next=[first_delta_id],
         )
 
-        timestamp = _get_timestamp()
-        forward, backward = _get_forward_backward_deltas(
-            self.doc, _update_doc(self.doc)
-        )
+        timestamp = _TIMESTAMP
+        forward, backward = self.update_deltas
         first_delta = dict(
             _id=first_delta_id,
             document_id=self.doc['_id'],
             collection_version_id=2,
             branch='main',
             timestamp=timestamp,
-            forward=forward.dumps(),
-            backward=backward.dumps(),
+            forward=_dumps(forward),
+            backward=_dumps(backward),
             prev=parent_delta['_id'],
             next=[],
         )
 
-        find_mock.return_value = [deepcopy(parent_delta), deepcopy(first_delta)]
+        self.mocks['find'].return_value = [
+            _copy_delta_doc(parent_delta),
+            _copy_delta_doc(first_delta),
+        ]
 
         doc_old = self.doc
         doc_new = _update_doc(_update_doc(self.doc))
@@ -776,74 +761,51 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
         )
         self.assertEqual(first_delta_id, ret_delta_id)
 
-        insert_one_mock.assert_not_called()
-        find_one_and_update_mock.assert_not_called()
-
         forward2, backward2 = _get_forward_backward_deltas(doc_old, doc_new)
 
-        update_one_mock.assert_called_once_with(
-            {'_id': first_delta['_id']},
-            update={
-                "$set": {
-                    'forward': forward2.dumps(),
-                    'backward': backward2.dumps(),
-                }
-            },
+        self.mocks['bulk_write'].assert_called_once_with(
+            [
+                pymongo.UpdateOne(
+                    {'_id': first_delta['_id']},
+                    {
+                        "$set": {
+                            'forward': _dumps(forward2),
+                            'backward': _dumps(backward2),
+                        }
+                    },
+                )
+            ]
         )
 
-    @patch.object(pymongo.collection.Collection, 'find')
-    @patch.object(pymongo.collection.Collection, 'update_one')
-    @patch.object(pymongo.collection.Collection, 'insert_one')
-    @patch.object(pymongo.collection.Collection, 'find_one_and_update')
-    def test_add_delta_with_existing_parent_on_a_branch(
-        self,
-        find_one_and_update_mock,
-        insert_one_mock,
-        update_one_mock,
-        find_mock,
-    ):
+    def test_add_delta_with_existing_parent_on_a_branch(self):
         self._test_add_delta_with_existing_parent(
-            find_one_and_update_mock,
-            insert_one_mock,
-            update_one_mock,
-            find_mock,
             child_version=0,
             child_branch='branch',
         )
 
-    @patch.object(pymongo.collection.Collection, 'find')
-    @patch.object(pymongo.collection.Collection, 'update_one')
-    @patch.object(pymongo.collection.Collection, 'insert_one')
-    @patch.object(pymongo.collection.Collection, 'find_one_and_update')
-    def test_add_delta_on_branch_with_unconnected_delta_tree(
-        self,
-        find_one_and_update_mock,
-        insert_one_mock,
-        update_one_mock,
-        find_mock,
-    ):
+    def test_add_delta_on_branch_with_unconnected_delta_tree(self):
         # add a document on 2 different branches such that for both branches,
         # the deltas are added after the version corresponding to the
         # intersection of the branches, i.e., the LCA corresponding to the
         # versions for which the deltas are registered.
 
-        forward, backward = _get_forward_backward_deltas(dict(), self.doc)
+        forward, backward = self.insert_deltas
 
         other_delta = dict(
             _id=ObjectId(),
             document_id=self.doc['_id'],
             collection_version_id=4,
             branch='main',
-            timestamp=_get_timestamp(),
-            forward=forward.dumps(),
-            backward=backward.dumps(),
+            timestamp=_TIMESTAMP,
+            forward=_dumps(forward),
+            backward=_dumps(backward),
             prev=None,
             next=[],
         )
-        find_mock.return_value = [deepcopy(other_delta)]
+        self.mocks['find'].return_value = [_copy_delta_doc(other_delta)]
 
         delta_id = ObjectId()
-        timestamp = _get_timestamp()
+        timestamp = _TIMESTAMP
         ret_delta_id = self.col.add_delta(
             document_new=self.doc,
             document_old=dict(),
@@ -856,29 +818,123 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
         )
         self.assertEqual(delta_id, ret_delta_id)
 
-        update_one_mock.assert_not_called()
-        find_one_and_update_mock.assert_not_called()
-
         delta_doc = dict(
             _id=delta_id,
             document_id=self.doc['_id'],
             collection_version_id=1,
             branch='branch',
             timestamp=timestamp,
-            forward=forward.dumps(),
-            backward=backward.dumps(),
+            forward=_dumps(forward),
+            backward=_dumps(backward),
             prev=None,
             next=[],
         )
-        insert_one_mock.assert_called_once_with(delta_doc)
+        self.mocks['bulk_write'].assert_called_once_with(
+            [pymongo.InsertOne(delta_doc)]
+        )
+
+    def test_add_delta_for_an_unmodified_document_does_not_diff_it(self):
+        with patch(
+            'versioned_collection.collection.tracking_collections.deltas'
+            '.DeepDiff'
+        ) as mock:
+            delta_id = self.col.add_delta(
+                document_new=self.doc,
+                document_old=dict(self.doc),
+                document_id=self.doc['_id'],
+                collection_version=1,
+                branch='main',
+                timestamp=_TIMESTAMP,
+                branch_history=[],
+            )
+        self.assertIsNone(delta_id)
+        mock.assert_not_called()
+        self.mocks['find'].assert_not_called()
 
-    @patch.object(pymongo.collection.Collection, 'insert_many')
-    @patch.object(pymongo.collection.Collection, 'find_one_and_update')
-    def test_insert_delta_docs(
-        self,
-        find_one_and_update_mock,
-        insert_many_mock,
-    ):
+    def test_add_delta_records_type_changes(self):
+        self.mocks['find'].return_value = []
+        delta_id = self.col.add_delta(
+            document_new={**self.doc, 'v': 0.0},
+            document_old=self.doc,
+            document_id=self.doc['_id'],
+            collection_version=1,
+            branch='main',
+            timestamp=_TIMESTAMP,
+            branch_history=[],
+        )
+        self.assertIsNotNone(delta_id)
+        self.mocks['bulk_write'].assert_called_once()
+
+    def test_add_deltas_uses_a_single_query_and_bulk_write(self):
+        forward, backward = self.insert_deltas
+        parent_delta = dict(
+            _id=ObjectId(),
+            document_id=self.doc['_id'],
+            collection_version_id=1,
+            branch='main',
+            timestamp=_TIMESTAMP,
+            forward=_dumps(forward),
+            backward=_dumps(backward),
+            prev=None,
+            next=[],
+        )
+        self.mocks['find'].return_value = [_copy_delta_doc(parent_delta)]
+
+        updated_doc = _update_doc(self.doc)
+        new_doc = {'_id': ObjectId(), 'v': 0}
+        unchanged_doc = {'_id': ObjectId(), 'v': 0}
+
+        timestamp = _TIMESTAMP
+        delta_ids = self.col.add_deltas(
+            [
+                (self.doc, updated_doc, self.doc['_id']),
+                (dict(), new_doc, new_doc['_id']),
+                (unchanged_doc, unchanged_doc, unchanged_doc['_id']),
+            ],
+            collection_version=2,
+            branch='main',
+            timestamp=timestamp,
+            branch_history=[(1, 'main'), (0, 'main')],
+        )
+        updated_delta_id, new_delta_id, unchanged_delta_id = delta_ids
+        self.assertIsNone(unchanged_delta_id)
+
+        # The deltas of the unchanged document are not retrieved
+        self.mocks['find'].assert_called_once_with(
+            {'document_id': {"$in": [self.doc['_id'], new_doc['_id']]}}
+        )
+
+        def _delta_doc(delta_id, doc_old, doc_new, prev):
+            forward, backward = _get_forward_backward_deltas(doc_old, doc_new)
+            return dict(
+                _id=delta_id,
+                document_id=doc_new['_id'],
+                collection_version_id=2,
+                branch='main',
+                timestamp=timestamp,
+                forward=_dumps(forward),
+                backward=_dumps(backward),
+                prev=prev,
+                next=[],
+            )
+
+        self.mocks['bulk_write'].assert_called_once_with([
+            pymongo.InsertOne(
+                _delta_doc(
+                    updated_delta_id, self.doc, updated_doc, parent_delta['_id']
+                )
+            ),
+            pymongo.UpdateOne(
+                {'_id': parent_delta['_id']},
+                {"$set": {"next": [updated_delta_id]}},
+            ),
+            pymongo.InsertOne(_delta_doc(new_delta_id, dict(), new_doc, None)),
+        ])
+        self.mocks['insert_one'].assert_not_called()
+        self.mocks['update_one'].assert_not_called()
+        self.mocks['find_one_and_update'].assert_not_called()
+
+    def test_insert_delta_docs(self):
         d_id_1, d_id_2, d_id_3 = ObjectId(), ObjectId(), ObjectId()
         root_id = ObjectId()
         # fake
@@ -889,9 +945,9 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
             document_id=ObjectId(),
             collection_version_id=1,
             branch='main',
-            timestamp=_get_timestamp(),
-            forward=forward.dumps(),
-            backward=backward.dumps(),
+            timestamp=_TIMESTAMP,
+            forward=_dumps(forward),
+            backward=_dumps(backward),
             prev=root_id,
             next=[d_id_2, ObjectId(), ObjectId()],
         )
@@ -900,9 +956,9 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
             document_id=ObjectId(),
             collection_version_id=2,
             branch='main',
-            timestamp=_get_timestamp(),
-            forward=forward.dumps(),
-            backward=backward.dumps(),
+            timestamp=_TIMESTAMP,
+            forward=_dumps(forward),
+            backward=_dumps(backward),
             prev=d_id_1,
             next=[d_id_3, ObjectId()],
         )
@@ -911,9 +967,9 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
             document_id=ObjectId(),
             collection_version_id=3,
             branch='main',
-            timestamp=_get_timestamp(),
-            forward=forward.dumps(),
-            backward=backward.dumps(),
+            timestamp=_TIMESTAMP,
+            forward=_dumps(forward),
+            backward=_dumps(backward),
             prev=d_id_2,
             next=[],
         )
@@ -921,17 +977,16 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
         deltas = [delta_1, delta_2, delta_3]
         self.col.insert_delta_docs(deltas)
 
-        find_one_and_update_mock.assert_called_once_with(
+        self.mocks['find_one_and_update'].assert_called_once_with(
             filter={'_id': root_id},
             update={"$push": {"next": d_id_1}},
         )
 
         delta_1['next'] = [d_id_2]
         delta_2['next'] = [d_id_3]
-        insert_many_mock.assert_called_once_with(deltas)
+        self.mocks['insert_many'].assert_called_once_with(deltas)
 
-    @patch.object(pymongo.collection.Collection, 'aggregate')
-    def test_get_delta_documents_in_path_forward(self, aggregate_mock):
+    def test_get_delta_documents_in_path_forward(self):
         # Path from version (0, 'm') to (2, 'm')
         path = {(0, 'm'): 1, (1, 'm'): 1, (2, 'm'): 1}
 
@@ -939,27 +994,9 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
 
         # We don't care for delta (0, 'm') since that would move to (0, 'm'),
         # not from (0, 'm')
-        cond = {
-            "$or": [
-                {'collection_version_id': 1, 'branch': 'm'},
-                {'collection_version_id': 2, 'branch': 'm'},
-            ]
-        }
-        aggregate_mock.assert_called_once_with(
-            [
-                {"$match": cond},
-                {
-                    "$group": {
-                        '_id': "$document_id",
-                        'deltas': {"$push": "$$ROOT"},
-                    }
-                },
-            ],
-            allowDiskUse=True,
-        )
+        self.assertPathDeltasMatched({'m': {1, 2}})
 
-    @patch.object(pymongo.collection.Collection, 'aggregate')
-    def test_get_delta_documents_in_path_backward(self, aggregate_mock):
+    def test_get_delta_documents_in_path_backward(self):
         # Path from version (2, 'm') to (0, 'm')
         path = {(2, 'm'): -1, (1, 'm'): -1, (0, 'm'): -1}
 
@@ -967,52 +1004,32 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
 
         # We don't care for delta (0, 'm') since that would move backward from
         # (0, 'm'), not to (0, 'm')
-        cond = {
-            "$or": [
-                {'collection_version_id': 2, 'branch': 'm'},
-                {'collection_version_id': 1, 'branch': 'm'},
-            ]
-        }
-        aggregate_mock.assert_called_once_with(
-            [
-                {"$match": cond},
-                {
-                    "$group": {
-                        '_id': "$document_id",
-                        'deltas': {"$push": "$$ROOT"},
-                    }
-                },
-            ],
-            allowDiskUse=True,
+        self.assertPathDeltasMatched({'m': {1, 2}})
+
+    def test_get_delta_documents_in_path_allows_disk_use(self):
+        # By default, the aggregation may spill to disk. The deltas of all the
+        # documents are pushed into the groups, which can exceed the memory
+        # limit of the $group stage on large collections.
+        self.col.get_delta_documents_in_path({(0, 'm'): 1, (1, 'm'): 1})
+        _, kwargs = self.mocks['aggregate'].call_args
+        self.assertEqual({'allowDiskUse': True}, kwargs)
+
+    def test_get_delta_documents_in_path_without_disk_use(self):
+        self.col.get_delta_documents_in_path(
+            {(0, 'm'): 1, (1, 'm'): 1}, allow_disk_use=False
         )
+        _, kwargs = self.mocks['aggregate'].call_args
+        self.assertEqual({}, kwargs)
 
-    @patch.object(pymongo.collection.Collection, 'aggregate')
-    def test_get_delta_documents_in_path_with_branches(self, aggregate_mock):
+    def test_get_delta_documents_in_path_with_branches(self):
         path = {(1, 'm'): -1, (0, 'm'): 1, (1, 'b'): 1}
 
         self.col.get_delta_documents_in_path(path)
 
-        cond = {
-            "$or": [
-                {'collection_version_id': 1, 'branch': 'm'},
-                {'collection_version_id': 0, 'branch': 'm'},
-                {'collection_version_id': 1, 'branch': 'b'},
-            ]
-        }
-        aggregate_mock.assert_called_once_with(
-            [
-                {"$match": cond},
-                {
-                    "$group": {
-                        '_id': "$document_id",
-                        'deltas': {"$push": "$$ROOT"},
-                    }
-                },
-            ],
-            allowDiskUse=True,
-        )
+        self.assertPathDeltasMatched({'m': {0, 1}, 'b': {1}})
 
-    def _setup(self):
+    @classmethod
+    def _build_fixtures(cls):
         """
             ::
 
@@ -1025,154 +1042,47 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
                           \\                  \\
                           3_m                 3_m
         """
+        doc_id = cls.doc['_id']
+        doc_v2 = _update_doc(cls.doc)
+        doc_v3 = _update_doc(doc_v2)
 
-        # self.doc
-        delta_docs = dict()
-        d1_ids = {v: ObjectId() for v in ['1_m', '2_m', '3_m', '0_b']}
-        deep_deltas = dict()
-        d1_deltas = defaultdict(dict)
-        forward, backward = _get_forward_backward_deltas(dict(), self.doc)
-        d1_deltas['1_m']['f'] = forward
-        d1_deltas['1_m']['b'] = backward
-        d1_1_m = dict(
-            _id=d1_ids['1_m'],
-            document_id=self.doc['_id'],
-            collection_version_id=1,
-            branch='main',
-            timestamp=_get_timestamp(),
-            forward=forward.dumps(),
-            backward=backward.dumps(),
-            prev=None,
-            next=[d1_ids['2_m'], d1_ids['0_b']],
-        )
-
-        forward, backward = _get_forward_backward_deltas(
-            self.doc, _update_doc(self.doc)
-        )
-        d1_deltas['2_m']['f'] = forward
-        d1_deltas['2_m']['b'] = backward
-        d1_2_m = dict(
-            _id=d1_ids['2_m'],
-            document_id=self.doc['_id'],
-            collection_version_id=2,
-            branch='main',
-            timestamp=_get_timestamp(),
-            forward=forward.dumps(),
-            backward=backward.dumps(),
-            prev=d1_ids['1_m'],
-            next=[d1_ids['3_m']],
-        )
-
-        forward, backward = _get_forward_backward_deltas(
-            _update_doc(self.doc), _update_doc(_update_doc(self.doc))
-        )
-        d1_deltas['3_m']['f'] = forward
-        d1_deltas['3_m']['b'] = backward
-        d1_3_m = dict(
-            _id=d1_ids['3_m'],
-            document_id=self.doc['_id'],
-            collection_version_id=3,
-            branch='main',
-            timestamp=_get_timestamp(),
-            forward=forward.dumps(),
-            backward=backward.dumps(),
-            prev=d1_ids['2_m'],
-            next=[],
-        )
-
-        forward, backward = _get_forward_backward_deltas(
-            self.doc, _update_doc(self.doc)
-        )
-        d1_deltas['0_b']['f'] = forward
-        d1_deltas['0_b']['b'] = backward
-        d1_0_b = dict(
-            _id=d1_ids['0_b'],
-            document_id=self.doc['_id'],
-            collection_version_id=0,
-            branch='b',
-            timestamp=_get_timestamp(),
-            forward=forward.dumps(),
-            backward=backward.dumps(),
-            prev=d1_ids['1_m'],
-            next=[],
-        )
-        delta_docs[self.doc['_id']] = {
-            '1_m': d1_1_m,
-            '2_m': d1_2_m,
-            '3_m': d1_3_m,
-            '0_b': d1_0_b,
-        }
-        deep_deltas[self.doc['_id']] = d1_deltas
-
-        # self.doc2
-        self.doc2 = deepcopy(self.doc)
-        self.doc2['_id'] = ObjectId()
-        self.doc2['stop'] = 'hammer time'
-        d2_ids = {v: ObjectId() for v in ['1_m', '3_m', '0_c']}
-        d2_deltas = defaultdict(dict)
-
-        forward, backward = _get_forward_backward_deltas(dict(), self.doc2)
-        d2_deltas['0_c']['f'] = forward
-        d2_deltas['0_c']['b'] = backward
-        d2_0_c = dict(
-            _id=d2_ids['0_c'],
-            document_id=self.doc2['_id'],
-            collection_version_id=0,
-            branch='c',
-            timestamp=_get_timestamp(),
-            forward=forward.dumps(),
-            backward=backward.dumps(),
-            prev=None,
-            next=[],
-        )
+        cls.doc2 = {**cls.doc, '_id': ObjectId(), 'stop': 'hammer time'}
+        doc2_id = cls.doc2['_id']
+        doc2_v2 = _update_doc(cls.doc2)
 
-        forward, backward = _get_forward_backward_deltas(
-            dict(), _update_doc(self.doc2)
+        delta_docs, deep_deltas = dict(), dict()
+        delta_docs[doc_id], deep_deltas[doc_id] = _build_delta_tree(
+            doc_id,
+            {
+                '1_m': (1, 'main', None, dict(), cls.doc),
+                '2_m': (2, 'main', '1_m', cls.doc, doc_v2),
+                '3_m': (3, 'main', '2_m', doc_v2, doc_v3),
+                '0_b': (0, 'b', '1_m', cls.doc, doc_v2),
+            },
         )
-        d2_deltas['1_m']['f'] = forward
-        d2_deltas['1_m']['b'] = backward
-        d2_1_m = dict(
-            _id=d2_ids['1_m'],
-            document_id=self.doc2['_id'],
-            collection_version_id=1,
-            branch='main',
-            timestamp=_get_timestamp(),
-            forward=forward.dumps(),
-            backward=backward.dumps(),
-            prev=None,
-            next=[d2_ids['3_m']],
+        delta_docs[doc2_id], deep_deltas[doc2_id] = _build_delta_tree(
+            doc2_id,
+            {
+                '1_m': (1, 'main', None, dict(), doc2_v2),
+                '3_m': (3, 'main', '1_m', dict(), doc2_v2),
+                '0_c': (0, 'c', None, dict(), cls.doc2),
+            },
         )
+        return delta_docs, deep_deltas
 
-        forward, backward = _get_forward_backward_deltas(
-            dict(), _update_doc(self.doc2)
-        )
-        d2_deltas['3_m']['f'] = forward
-        d2_deltas['3_m']['b'] = backward
-        d2_3_m = dict(
-            _id=d2_ids['3_m'],
-            document_id=self.doc2['_id'],
-            collection_version_id=3,
-            branch='main',
-            timestamp=_get_timestamp(),
-            forward=forward.dumps(),
-            backward=backward.dumps(),
-            prev=d2_ids['1_m'],
-            next=[],
-        )
-        delta_docs[self.doc2['_id']] = {
-            '1_m': d2_1_m,
-            '3_m': d2_3_m,
-            '0_c': d2_0_c,
+    def _setup(self):
+        # get_deltas consumes the ids of the delta documents, so each test
+        # gets its own copies of the shared delta documents.
+        delta_docs = {
+            doc_id: {label: dict(d) for label, d in docs.items()}
+            for doc_id, docs in self.delta_docs.items()
         }
-        deep_deltas[self.doc2['_id']] = d2_deltas
-
-        return delta_docs, deep_deltas
+        return delta_docs, self.deep_deltas
 
-    @patch.object(pymongo.collection.Collection, 'aggregate')
-    def test_get_deltas_linear_forward_1(self, aggregate_mock):
+    def test_get_deltas_linear_forward_1(self):
         delta_docs, deep_deltas = self._setup()
 
-        aggregate_mock.return_value = [
+        self.mocks['aggregate'].return_value = [
             {'_id': doc_id, 'deltas': list(delta_docs[doc_id].values())}
             for doc_id in delta_docs.keys()
         ]
@@ -1196,13 +1106,12 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
         ]
         self.assertEqualDeltaLists(doc_2_deltas, deltas[doc_2_id])
 
-    @patch.object(pymongo.collection.Collection, 'aggregate')
-    def test_get_deltas_linear_forward_2(self, aggregate_mock):
+    def test_get_deltas_linear_forward_2(self):
         delta_docs, deep_deltas = self._setup()
         doc_1_id = self.doc['_id']
         doc_2_id = self.doc2['_id']
 
-        aggregate_mock.return_value = [
+        self.mocks['aggregate'].return_value = [
             {
                 '_id': doc_1_id,
                 'deltas': [
@@ -1227,13 +1136,12 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
         ]
         self.assertEqualDeltaLists(doc_2_deltas, deltas[doc_2_id])
 
-    @patch.object(pymongo.collection.Collection, 'aggregate')
-    def test_get_deltas_linear_backward(self, aggregate_mock):
+    def test_get_deltas_linear_backward(self):
         delta_docs, deep_deltas = self._setup()
         doc_1_id = self.doc['_id']
         doc_2_id = self.doc2['_id']
 
-        aggregate_mock.return_value = [
+        self.mocks['aggregate'].return_value = [
             {'_id': doc_1_id, 'deltas': [delta_docs[doc_1_id]['3_m']]},
             {'_id': doc_2_id, 'deltas': [delta_docs[doc_2_id]['3_m']]},
         ]
@@ -1251,13 +1159,12 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
         ]
         self.assertEqualDeltaLists(doc_2_deltas, deltas[doc_2_id])
 
-    @patch.object(pymongo.collection.Collection, 'aggregate')
-    def test_get_deltas_branch_complete(self, aggregate_mock):
+    def test_get_deltas_branch_complete(self):
         delta_docs, deep_deltas = self._setup()
         doc_1_id = self.doc['_id']
         doc_2_id = self.doc2['_id']
 
-        aggregate_mock.return_value = [
+        self.mocks['aggregate'].return_value = [
             {'_id': doc_1_id, 'deltas': list(delta_docs[doc_1_id].values())},
             {
                 '_id': doc_2_id,
@@ -1284,13 +1191,12 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
         ]
         self.assertEqualDeltaLists(doc_2_deltas, deltas[doc_2_id])
 
-    @patch.object(pymongo.collection.Collection, 'aggregate')
-    def test_get_deltas_branch_partial(self, aggregate_mock):
+    def test_get_deltas_branch_partial(self):
         delta_docs, deep_deltas = self._setup()
         doc_1_id = self.doc['_id']
         doc_2_id = self.doc2['_id']
 
-        aggregate_mock.return_value = [
+        self.mocks['aggregate'].return_value = [
             {
                 '_id': doc_1_id,
                 'deltas': [
@@ -1341,8 +1247,7 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
         f_deltas = [doc1_deltas[v]['f'] for v in ['1_m', '2_m', '3_m']]
         b_deltas = [doc1_deltas[v]['b'] for v in ['3_m', '2_m', '1_m']]
 
-        doc_v3_expected = deepcopy(self.doc)
-        doc_v3_expected['v'] = 2
+        doc_v3_expected = {**self.doc, 'v': 2}
         result = self.col.apply_deltas(
             per_document_deltas={doc_id: f_deltas}, documents=[self.doc]
         )
@@ -7,12 +7,11 @@ class TestDeltasCollectionUnitTests(InMemoryDatabaseSetup):
     @classmethod
     def setUpClass(cls) -> None:
         super().setUpClass()
-
-    def setUp(self):
-        self.col = LockCollection(self.database)
+        cls.col = LockCollection(cls.database)
 
     def tearDown(self):
-        self.col.drop()
+        # Cheaper than dropping the collection after each test.
+        self.col.delete_many({})
 
     def test_init(self):
         col_name = "i_need_a_beer_a_beer_is_what_i_need"
@@ -33,7 +33,9 @@ class _BaseTrackerCollection(Collection):
 
     def exists(self) -> bool:
         """Check whether this collection exists in the database."""
-        return self.name in self.database.list_collection_names()
+        # Filter on the server, instead of listing all the collections.
+        names = self.database.list_collection_names(filter={'name': self.name})
+        return self.name in names
 
     def build(self, *args, **kwargs) -> bool:
         """Create the collection on the database."""
@@ -65,11 +65,18 @@ class BranchesCollection(_BaseTrackerCollection):
     def build(self) -> bool:
         """Create the collection on the database.
 
+        .. note::
+            The unique index on the branch names is only created here, so
+            branches collections built by earlier releases keep their
+            non-unique index and rely on :meth:`create_branch` to reject
+            duplicate names.
+
         :return: ``False`` if the collection already exists, ``True`` otherwise.
         """
         if self.exists():
             return False
-        self.create_index('name')
+        # Branch names are unique, and the index covers `has_branch` queries.
+        self.create_index('name', unique=True)
         self.create_branch(
             branch='main',
             pointing_to_collection_version=0,
@@ -79,7 +86,12 @@ class BranchesCollection(_BaseTrackerCollection):
 
     def has_branch(self, branch_name: str) -> bool:
         """Check whether a branch name with the provided name exists."""
-        return self.find_one({'name': branch_name}) is not None
+        return (
+            self.find_one(
+                {'name': branch_name}, projection={'_id': 0, 'name': 1}
+            )
+            is not None
+        )
 
     def get_branch_names(self) -> Set[str]:
         """Return the names of the existing branches."""
@@ -129,16 +141,17 @@ class BranchesCollection(_BaseTrackerCollection):
             collection was registered.
         :param new_name: The new name of the branch.
         """
-        if not self.has_branch(branch):
-            raise BranchNotFound(branch)
-
         new_data = self.SCHEMA(
             name=branch if new_name is None else new_name,
             points_to_collection_version=pointing_to_collection_version,
             points_to_branch=pointing_to_branch,
         ).__dict__
 
-        self.find_one_and_replace(filter={'name': branch}, replacement=new_data)
+        old_data = self.find_one_and_replace(
+            filter={'name': branch}, replacement=new_data
+        )
+        if old_data is None:
+            raise BranchNotFound(branch)
 
     def get_branch(self, branch: str) -> SCHEMA:
         """Retrieve the branch information.
@@ -179,14 +192,11 @@ class BranchesCollection(_BaseTrackerCollection):
 
     def get_empty_branches(self) -> Set[BranchesCollection.SCHEMA]:
         """Return a set of empty branches data."""
-        branches = list(
-            self.find({"$expr": {"$ne": ['$name', '$points_to_branch']}})
+        branches = self.find(
+            filter={"$expr": {"$ne": ['$name', '$points_to_branch']}},
+            projection={'_id': False},
         )
-        branches_data = set()
-        for b in branches:
-            b.pop('_id')
-            branches_data.add(self.SCHEMA(**b))
-        return branches_data
+        return {self.SCHEMA(**b) for b in branches}
 
     def delete_branches(self, branches: List[str]) -> None:
         """Delete the branches with names in the given list."""
@@ -1,13 +1,16 @@
 import dataclasses
 import datetime
+from collections import defaultdict
 from copy import deepcopy
 from functools import partial
 from multiprocessing import cpu_count, Pool
-from typing import Any, Dict, Optional, List, Tuple, Union
+from typing import Any, Dict, Iterable, Optional, List, Tuple, Union
 
+import bson
 import pymongo
 from bson import ObjectId
 from deepdiff import DeepDiff, Delta
+from pymongo import InsertOne, UpdateOne
 from pymongo.command_cursor import CommandCursor
 from pymongo.database import Database
 from treelib import Node
@@ -16,8 +19,21 @@ from versioned_collection.collection.tracking_collections import (
     _BaseTrackerCollection,
 )
 from versioned_collection.tree import Tree
-from versioned_collection.utils.data_structures import hashabledict
-from versioned_collection.utils.mongo_query import group_documents_by_id
+from versioned_collection.utils.mongo_query import (
+    group_documents_by_id,
+    hashable_id,
+)
+
+
+@dataclasses.dataclass
+class _DeltaWrite:
+    """The writes needed to record a delta document."""
+
+    delta_doc: Dict[str, Any]
+    # Whether the deltas of an already registered delta document are replaced
+    update: bool
+    # The new forward references of the parent delta document, if any
+    parent_next: Optional[List[ObjectId]]
 
 
 class DeltasCollection(_BaseTrackerCollection):
@@ -153,6 +169,31 @@ class DeltasCollection(_BaseTrackerCollection):
 
         return tree
 
+    @staticmethod
+    def _compute_forward_delta(
+        document_old: _DOCUMENT_TYPE, document_new: _DOCUMENT_TYPE
+    ) -> Optional[Delta]:
+        """Compute the forward delta, or ``None`` if there are no changes."""
+        # Identical documents are common when a chunk is registered, and
+        # comparing their BSON encodings is much cheaper than diffing them.
+        # Unlike ``==``, this also tells apart values of different types
+        # (e.g., 1 and 1.0), which the deltas must record.
+        if bson.encode(document_old) == bson.encode(document_new):
+            return None
+        forward = DeepDiff(
+            document_old,
+            document_new,
+            ignore_order=False,
+            report_repetition=False,
+        )
+
+        # No changes actually made since the previous registered version.
+        # This can be caused by updating the document once, and then updating
+        # it again to its previous version.
+        if forward == {}:
+            return None
+        return Delta(forward)
+
     def add_delta(
         self,
         document_old: _DOCUMENT_TYPE,
@@ -185,26 +226,138 @@ class DeltasCollection(_BaseTrackerCollection):
         :return: The id of the delta document, or ``None`` if the two versions
             of the document are unchanged.
         """
-        forward = DeepDiff(
-            document_old,
-            document_new,
-            ignore_order=False,
-            report_repetition=False,
-        )
+        return self.add_deltas(
+            [(document_old, document_new, document_id)],
+            collection_version=collection_version,
+            branch=branch,
+            timestamp=timestamp,
+            branch_history=branch_history,
+            with_ids=[with_id],
+        )[0]
 
-        # No changes actually made since the previous registered version.
-        # This can be caused by updating the document once, and then updating
-        # it again to its previous version.
-        if forward == {}:
-            return None
+    def add_deltas(
+        self,
+        documents: List[Tuple[_DOCUMENT_TYPE, _DOCUMENT_TYPE, Any]],
+        collection_version: int,
+        branch: str,
+        timestamp: datetime.datetime,
+        branch_history: List[Tuple[int, str]],
+        with_ids: Optional[List[Optional[ObjectId]]] = None,
+    ) -> List[Optional[ObjectId]]:
+        """Compute and record the deltas of multiple documents.
+
+        This is the batched version of :meth:`add_delta`. The existing deltas
+        of all the modified documents are retrieved with a single query and
+        all the new deltas are written with a single bulk write.
+
+        .. note::
+            The ids of the given documents must be unique, since the deltas of
+            a document depend on its previously registered deltas.
+
+        :raises InvalidCollectionState: If some deltas for the current
+            collection version cannot be identified.
+
+        :param documents: A list of (old version, new version, id) tuples
+            of the modified documents.
+        :param collection_version: The version of the tracked collection to
+            which the changes to the given documents should be registered.
+        :param branch: The branch that the modified target documents belong to.
+        :param timestamp: The date and time when the deltas were registered.
+        :param branch_history: A set containing (version, branch) tuples
+            from the previous version to the root of the version tree.
+        :param with_ids: Optional ids used for inserting the new delta
+            documents, in the order of `documents`.
+        :return: The ids of the delta documents, in the order of `documents`.
+            The id is ``None`` if the two versions of a document are
+            unchanged.
+        """
+        forwards = [
+            self._compute_forward_delta(old, new) for old, new, _ in documents
+        ]
+        modified_ids = [
+            document_id
+            for (_, _, document_id), forward in zip(documents, forwards)
+            if forward is not None
+        ]
+        if len(modified_ids) == 0:
+            return [None] * len(documents)
 
-        forward = Delta(forward)
+        deltas = defaultdict(list)
+        for delta in self.find({'document_id': {"$in": modified_ids}}):
+            deltas[hashable_id(delta['document_id'])].append(delta)
 
-        # Search the per-document delta tree for a previous delta
+        if with_ids is None:
+            with_ids = [None] * len(documents)
 
-        # Get the set of deltas
-        deltas = self.find({'document_id': document_id})
+        delta_ids = []
+        operations = []
+        for (old, new, document_id), forward, with_id in zip(
+            documents, forwards, with_ids
+        ):
+            if forward is None:
+                delta_ids.append(None)
+                continue
+
+            delta_id, write = self._prepare_delta(
+                forward=forward,
+                document_old=old,
+                document_new=new,
+                document_id=document_id,
+                collection_version=collection_version,
+                branch=branch,
+                timestamp=timestamp,
+                branch_history=branch_history,
+                deltas=deltas[hashable_id(document_id)],
+                with_id=with_id,
+            )
+            delta_ids.append(delta_id)
+            if write is None:
+                continue
 
+            delta_doc = write.delta_doc
+            if write.update:
+                update = {
+                    'forward': delta_doc['forward'],
+                    'backward': delta_doc['backward'],
+                }
+                operations.append(
+                    UpdateOne({'_id': delta_id}, {"$set": update})
+                )
+            else:
+                operations.append(InsertOne(delta_doc))
+            if write.parent_next is not None:
+                operations.append(
+                    UpdateOne(
+                        {'_id': delta_doc['prev']},
+                        {"$set": {"next": write.parent_next}},
+                    )
+                )
+
+        if len(operations) > 0:
+            self.bulk_write(operations)
+        return delta_ids
+
+    def _prepare_delta(
+        self,
+        forward: Delta,
+        document_old: _DOCUMENT_TYPE,
+        document_new: _DOCUMENT_TYPE,
+        document_id: Any,
+        collection_version: int,
+        branch: str,
+        timestamp: datetime.datetime,
+        branch_history: List[Tuple[int, str]],
+        deltas: Iterable[_DOCUMENT_TYPE],
+        with_id: Optional[ObjectId] = None,
+    ) -> Tuple[ObjectId, Optional[_DeltaWrite]]:
+        """Prepare the writes needed to record a delta of a document.
+
+        :param forward: The forward delta between the document versions.
+        :param deltas: The delta documents already registered for the
+            document.
+        :return: The id of the delta document and the writes to perform, or
+            ``None`` if the delta is already registered.
+        """
         # Keep only the deltas that are part of the branch history
         _hist_set = set(branch_history)
         # We have to add this for deltas that are already registered in case
@@ -277,7 +430,7 @@ class DeltasCollection(_BaseTrackerCollection):
                     # The document has not changed, but it was simply
                     # modified multiple times before registering the new
                     # version.
-                    return next_node.identifier
+                    return next_node.identifier, None
                 else:
                     update_forward_and_backward_deltas = True
                     delta_doc_id = next_node.identifier
@@ -307,31 +460,18 @@ class DeltasCollection(_BaseTrackerCollection):
         ).__dict__
 
         if update_forward_and_backward_deltas:
-            self.update_one(
-                {'_id': delta_doc_id},
-                update={
-                    "$set": {
-                        'forward': delta_doc['forward'],
-                        'backward': delta_doc['backward'],
-                    }
-                },
-            )
             delta_doc['_id'] = delta_doc_id
-        else:
-            if with_id:
-                delta_doc['_id'] = with_id
-            self.insert_one(delta_doc)
+            return delta_doc_id, _DeltaWrite(delta_doc, True, None)
+
+        delta_doc['_id'] = with_id if with_id else ObjectId()
 
         # Link the delta with its parent
+        parent_next = None
         if prev_delta_doc is not None:
-            next_list = prev_delta_node.data.next
-            next_list.append(delta_doc['_id'])
-            self.find_one_and_update(
-                filter={'_id': delta_doc['prev']},
-                update={"$set": {"next": next_list}},
-            )
+            parent_next = prev_delta_node.data.next
+            parent_next.append(delta_doc['_id'])
 
-        return delta_doc['_id']
+        return delta_doc['_id'], _DeltaWrite(delta_doc, False, parent_next)
 
     def insert_delta_docs(self, delta_docs: List[_DOCUMENT_TYPE]) -> None:
         """Insert a list of delta documents into this collection.
@@ -402,10 +542,7 @@ class DeltasCollection(_BaseTrackerCollection):
             _deltas = self._get_deltas(
                 self._build_partial_delta_tree(trees, path), path
             )
-            doc_id = doc['_id']
-            if isinstance(doc_id, dict):
-                doc_id = hashabledict(doc_id)
-            deltas[doc_id] = _deltas
+            deltas[hashable_id(doc['_id'])] = _deltas
 
         return deltas
 
@@ -493,6 +630,7 @@ class DeltasCollection(_BaseTrackerCollection):
         self,
         path: Dict[Tuple[int, str], int],
         sorting_order: Optional[int] = None,
+        allow_disk_use: bool = True,
     ) -> CommandCursor:
         """Get the delta documents grouped by tracked document's id in `path`.
 
@@ -501,6 +639,10 @@ class DeltasCollection(_BaseTrackerCollection):
         :param sorting_order: The order in which to sort the delta documents by
             timestamp. ``1`` means ascending and ``-1`` means descending.
             If omitted, the sorting step is skipped.
+        :param allow_disk_use: Whether the aggregation may spill to disk. The
+            ``$group`` stage pushes all the matched deltas, which can exceed
+            its memory limit on large collections. Disable it to keep the
+            aggregation in memory and fail fast instead.
         :return: The delta documents.
         """
         versions = list(path.keys())
@@ -512,10 +654,17 @@ class DeltasCollection(_BaseTrackerCollection):
                 elif path[versions[0]] in [0, 1]:
                     versions.pop(0)
 
+        # Match the versions of each branch with a single ``$in`` clause, which
+        # is served by the (collection_version_id, branch) index, instead of
+        # having one clause per version.
+        branch_versions: Dict[str, List[int]] = dict()
+        for v, b in versions:
+            branch_versions.setdefault(b, []).append(v)
+
         # fmt: off
         cond = {"$or": [
-            {'collection_version_id': v, 'branch': b}
-            for (v, b) in versions
+            {'collection_version_id': {"$in": vs}, 'branch': b}
+            for b, vs in branch_versions.items()
         ]}
         # fmt: on
 
@@ -525,13 +674,15 @@ class DeltasCollection(_BaseTrackerCollection):
             else []
         )
 
+        options = {'allowDiskUse': True} if allow_disk_use else {}
+
         # fmt: off
         documents = self.aggregate([
             {"$match": cond},
             *sort_stage,
             {"$group": {'_id': "$document_id", 'deltas': {"$push": "$$ROOT"}}}
         ],
-            allowDiskUse=True
+            **options
         )
         # fmt: on
         return documents
@@ -764,10 +915,8 @@ class DeltasCollection(_BaseTrackerCollection):
         # Sequentially apply the deltas
         for delta in deltas:
             document = document + delta
-        if isinstance(doc_id, dict):
-            doc_id = hashabledict(doc_id)
 
-        return doc_id, document
+        return hashable_id(doc_id), document
 
     def delete_subtrees(
         self,
@@ -376,6 +376,8 @@ class LogsCollection(_BaseTrackerCollection):
             path.append((src.identifier, -1))
             src = self._log_tree.parent(src.identifier)
 
+        # The path from the LCA to `dst` is collected in reverse, since
+        # inserting at the front of a list is linear in its length.
         _path_dst = [(dst.identifier, 0)]
         on_different_branches = False
         while src != dst:
@@ -385,7 +387,8 @@ class LogsCollection(_BaseTrackerCollection):
             # The order here also takes care to add the root of the subtree
             # rooted at the LCA.
             dst = self._log_tree.parent(dst.identifier)
-            _path_dst.insert(0, (dst.identifier, 1))
+            _path_dst.append((dst.identifier, 1))
+        _path_dst.reverse()
 
         path = path + _path_dst
 
@@ -52,6 +52,7 @@ from versioned_collection.tree import Tree
 from versioned_collection.utils.mongo_query import (
     group_documents_by_id,
     generate_pagination_query,
+    hashable_id,
 )
 from versioned_collection.utils.multi_processing import chunk_list
 from versioned_collection.utils.serialization import (
@@ -179,9 +180,9 @@ class VersionedCollection(Collection):
 
         # A versioned collection is tracked if there exists a log book in the
         # database associated to it.
-        self._tracked = (
-            LogsCollection.format_name(self.name)
-            in self.database.list_collection_names()
+        log_name = LogsCollection.format_name(self.name)
+        self._tracked = log_name in self.database.list_collection_names(
+            filter={'name': log_name}
         )
 
         self._locked: Optional[bool] = None
@@ -885,31 +886,39 @@ class VersionedCollection(Collection):
         deltas_collection = DeltasCollection(database, coll_name)
         modified_collection = ModifiedCollection(database, coll_name)
 
-        tracker_ids = list()
-        has_registered_deltas = False
-        for tracker_doc in modified_tracker_docs:
-            # Retrieve the documents
-            replica_doc = replica_collection.find_one(
-                {'_id': tracker_doc['_id']}
-            )
-            # If not found it was freshly added
-            replica_doc = {} if replica_doc is None else replica_doc
-            this_doc = this_collection.find_one({'_id': tracker_doc['_id']})
-            # If not found it was deleted since last version
-            this_doc = {} if this_doc is None else this_doc
-
-            res = deltas_collection.add_delta(
-                document_old=replica_doc,
-                document_new=this_doc,
-                document_id=tracker_doc['_id'],
-                collection_version=version,
-                branch=branch,
-                timestamp=timestamp,
-                branch_history=logs,
+        # Retrieve all the documents at once. If a document is not found in
+        # the replica, it was freshly added, and if it is not found in this
+        # collection, it was deleted since the last version.
+        ids = [tracker_doc['_id'] for tracker_doc in modified_tracker_docs]
+        replica_docs = group_documents_by_id(
+            replica_collection.find({'_id': {"$in": ids}})
+        )
+        this_docs = group_documents_by_id(
+            this_collection.find({'_id': {"$in": ids}})
+        )
+        documents = [
+            (
+                replica_docs.get(hashable_id(_id), {}),
+                this_docs.get(hashable_id(_id), {}),
+                _id,
             )
-            tracker_ids.extend(tracker_doc['tracker_ids'])
-            has_registered_deltas = has_registered_deltas or res is not None
+            for _id in ids
+        ]
 
+        delta_ids = deltas_collection.add_deltas(
+            documents,
+            collection_version=version,
+            branch=branch,
+            timestamp=timestamp,
+            branch_history=logs,
+        )
+        has_registered_deltas = any(_id is not None for _id in delta_ids)
+
+        tracker_ids = [
+            tracker_id
+            for tracker_doc in modified_tracker_docs
+            for tracker_id in tracker_doc['tracker_ids']
+        ]
         modified_collection.delete_modified(tracker_ids)
         return has_registered_deltas
 
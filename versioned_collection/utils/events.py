@@ -1,8 +1,33 @@
 from __future__ import annotations
 
-from enum import Enum
-from functools import reduce
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+
+_EVENTS = frozenset(['i', 'u', 'd'])
+
+# The transition table of the reduction rules described in
+# :func:`reduce_event_sequence`. A ``None`` event represents a no-op.
+# fmt: off
+_REDUCTION_RULES: Dict[Tuple[Optional[str], str], Optional[str]] = {
+    ('i', 'd'): None,  # Rule 2
+    ('i', 'u'): 'i',   # Rule 3
+    ('d', 'i'): 'u',   # Rule 4
+    ('u', 'u'): 'u',   # Rule 5
+    ('u', 'd'): 'd',   # Rule 6
+    (None, 'i'): 'i',  # Rule 7^
+    (None, 'u'): 'u',  # Rule 7^
+    (None, 'd'): 'd',  # Rule 7^
+}
+# fmt: on
+
+
+def _check_event(e: str) -> None:
+    if not isinstance(e, str):
+        raise ValueError(f"Events should be strings, found {type(e)}, for {e}")
+    if e not in _EVENTS:
+        raise ValueError(
+            f"Invalid value for event '{e}'. "
+            f"The allowed values are one of ['i', 'u', 'd']"
+        )
 
 
 def reduce_event_sequence(events: List[str]) -> Optional[str]:
@@ -74,58 +99,6 @@ def reduce_event_sequence(events: List[str]) -> Optional[str]:
         reduces to a no-op event, ``None`` is returned.
     """
 
-    class Event(Enum):
-        """Enumeration of possible events."""
-
-        INSERT = 'i'
-        UPDATE = 'u'
-        DELETE = 'd'
-        NOOP = None
-
-        @staticmethod
-        def get(e: str) -> Event:
-            if not isinstance(e, str):
-                raise ValueError(
-                    f"Events should be strings, found {type(e)}, for {e}"
-                )
-            if e == 'u':
-                ret = Event.UPDATE
-            elif e == 'i':
-                ret = Event.INSERT
-            elif e == 'd':
-                ret = Event.DELETE
-            else:
-                raise ValueError(
-                    f"Invalid value for event '{e}'. "
-                    f"The allowed values are one of ['i', 'u', 'd']"
-                )
-            return ret
-
-    def _reduce_fn(e1: Event, e2: Event) -> Event:
-        if e1 == Event.NOOP:
-            # Rule 7^
-            ret = e2
-        elif e1 == Event.INSERT and e2 == Event.DELETE:
-            # Rule 2
-            ret = Event.NOOP
-        elif e1 == Event.INSERT and e2 == Event.UPDATE:
-            # Rule 3
-            ret = Event.INSERT
-        elif e1 == Event.DELETE and e2 == Event.INSERT:
-            # Rule 4
-            ret = Event.UPDATE
-        elif e1 == Event.UPDATE == e2:
-            # Rule 5
-            ret = Event.UPDATE
-        elif e1 == Event.UPDATE and e2 == Event.DELETE:
-            # Rule 6
-            ret = Event.DELETE
-        else:
-            raise ValueError(
-                f"Invalid sequence of events '{e1.value} -> {e2.value}'."
-            )
-        return ret
-
     if events is None or len(events) == 0:
         raise ValueError(
             f"Invalid input events sequence. "
@@ -133,10 +106,21 @@ def reduce_event_sequence(events: List[str]) -> Optional[str]:
         )
     if len(events) == 1:
         # check if valid
-        Event.get(events[0])
+        _check_event(events[0])
         return events[0]
     if events[0] == 'i' and events[-1] == 'd':
         # Rule 1
         return None
 
-    return reduce(_reduce_fn, [Event.get(e) for e in events]).value
+    for e in events:
+        _check_event(e)
+
+    state = events[0]
+    for e in events[1:]:
+        try:
+            state = _REDUCTION_RULES[(state, e)]
+        except KeyError:
+            raise ValueError(
+                f"Invalid sequence of events '{state} -> {e}'."
+            ) from None
+    return state
@@ -6,18 +6,18 @@ from pymongo.cursor import Cursor
 from versioned_collection.utils.data_structures import hashabledict
 
 
+def hashable_id(document_id: Any) -> Any:
+    """Make a document id usable as a dictionary key or a set element."""
+    if isinstance(document_id, dict):
+        return hashabledict(document_id)
+    return document_id
+
+
 def group_documents_by_id(
     documents: Union[List[Dict[str, Any]], Cursor[Dict[str, Any]]]
 ) -> Dict[Any, Dict[str, Any]]:
     """Group a collection of documents by id."""
-    return dict(
-        [
-            (doc['_id'], doc)
-            if not isinstance(doc['_id'], dict)
-            else (hashabledict(doc['_id']), doc)
-            for doc in documents
-        ]
-    )
+    return {hashable_id(doc['_id']): doc for doc in documents}
 
 
 def generate_pagination_query(